@@ -3,10 +3,7 @@ from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QPu
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QIcon, QPixmap
 
-# Import the game solvers
-import queens
-import tango
-import zip
+# The game solvers are imported when first launched, to keep startup light
 from utils import create_title_label
 
 class GameButton(QPushButton):
@@ -108,31 +105,25 @@ class Dashboard(QMainWindow):
         self.move(frame_geometry.topLeft())
     
     def launch_queens(self):
-        self.hide()
-        queens_window = queens.QueensWindow()
-        queens_window.show()
-        # Wait for the window to close before showing dashboard again
-        while queens_window.isVisible():
-            QApplication.processEvents()
-        self.show()
+        import queens
+        self._show_child(queens.QueensWindow())
     
     def launch_tango(self):
-        self.hide()
-        tango_window = tango.Main()
-        tango_window.show()
-        # Wait for the window to close before showing dashboard again
-        while tango_window.isVisible():
-            QApplication.processEvents()
-        self.show()
+        import tango
+        self._show_child(tango.Main())
     
     def launch_zip(self):
+        import zip
+        self._show_child(zip.create_zip_window())
+
+    # Swap the dashboard for a game window; the dashboard comes back, through
+    # the event loop, once that window is closed and destroyed
+    def _show_child(self, window):
+        window.setAttribute(Qt.WA_DeleteOnClose)
+        window.destroyed.connect(self.show)
+        self._child = window  # keep a reference while the window is open
         self.hide()
-        zip_window = zip.create_zip_window()
-        zip_window.show()
-        # Wait for the window to close before showing dashboard again
-        while zip_window.isVisible():
-            QApplication.processEvents()
-        self.show()
+        window.show()
 
 def main():
     app = QApplication(sys.argv)
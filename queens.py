@@ -1,70 +1,206 @@
 import sys
+from array import array
+from collections import defaultdict
+
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QLineEdit, QPushButton, QMessageBox, QTableWidget, QVBoxLayout, QHBoxLayout
 from PyQt5.QtGui import QColor, QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 
 from utils import create_back_button
 
+try:
+    import numpy as np
+    from solver_kernel import _solve_kernel, warmup_queens
+except ImportError:  # numba not installed, use the pure-Python solver
+    _solve_kernel = None
+
 class QueensSolver:
-    # Initialize the solver with board size (n) and regions
+    MAX_DEAD_ENDS = 1_000_000  # cap on remembered dead-end states
+    MAX_PACKED = 64            # largest n whose masks fit the 64-bit buffers
+    CHECK_EVERY = 4096         # nodes between checks of should_stop
+
+    # Initialize the solver with board size (n) and regions, a flat
+    # row-major sequence of n*n region ids (cell (r, c) at r * n + c)
+    # Columns and regions in use are tracked as int bitmasks (bit i set = i taken)
     def __init__(self, n, regions):
         self.n = n
         self.regions = regions
         self.solution = [None] * n
-        self.used_cols = set()
-        self.used_regions = set()
-        self.queen_positions = []
-
-    # Check if (r, c) is adjacent (including diagonals) to any placed Q
-    def is_adjacent_conflict(self, r, c):
-        for qr, qc in self.queen_positions:
-            if abs(qr - r) <= 1 and abs(qc - c) <= 1:
-                return True
-        return False
-
-    # Backtracking algo to get a solution
-    def backtrack(self, row=0):
-        if row == self.n:
-            return True
-
-        for col in range(self.n):
-            region_id = self.regions[row][col]
-
-            # One Q per column
-            if col in self.used_cols:
-                continue
-
-            # One Q per region
-            if region_id in self.used_regions:
-                continue
+        self.used_cols = 0
+        self.used_regions = 0
+        # (used_cols, used_regions, prev_mask) states known to have no
+        # solution below them; the row is implied by the number of used cols
+        self.dead = set()
+        # Optional callable; once it returns True the search gives up
+        self.should_stop = None
+
+        # Renumber regions 0..k-1. A solution gives every region exactly one
+        # Q, so there must be exactly n regions for one to exist.
+        rank = {}
+        for rid in regions:
+            rank.setdefault(rid, len(rank))
+        self.num_regions = len(rank)
+        if self.num_regions != n:
+            self.rbits = self.region_rows = None
+            return
 
-            # No adjacent Qs
-            if self.is_adjacent_conflict(row, col):
+        # Each cell's region bit, flat and indexed by row * n + col, and the
+        # columns each region covers in each row, indexed by rid * n + row.
+        # Packed 64-bit buffers (which the compiled kernel reads) when the
+        # masks fit, plain lists of Python ints on bigger boards.
+        if n <= self.MAX_PACKED:
+            self.rbits = array("Q", (1 << rank[rid] for rid in regions))
+            self.region_rows = array("Q", [0]) * (n * n)
+        else:
+            self.rbits = [1 << rank[rid] for rid in regions]
+            self.region_rows = [0] * (n * n)
+        for i, rid in enumerate(regions):
+            r, c = divmod(i, n)
+            self.region_rows[rank[rid] * n + r] |= 1 << c
+
+        # First and last row each region reaches
+        self.row_lo = array("q", [n]) * n
+        self.row_hi = array("q", [-1]) * n
+        for i, rid in enumerate(regions):
+            r = i // n
+            k = rank[rid]
+            self.row_lo[k] = min(self.row_lo[k], r)
+            self.row_hi[k] = max(self.row_hi[k], r)
+
+    # Candidate columns for a Q in `row`, most constrained region first.
+    # Forward checking: counts the cells each unplaced region has left in
+    # this row and below, and returns no candidates if any region has none.
+    # An unplaced region whose last row is `row` must take this row's Q, so
+    # only its columns are candidates (and two such regions is a dead end).
+    def candidates(self, row, prev_mask):
+        n = self.n
+        used_regions = self.used_regions
+        region_rows = self.region_rows
+        row_lo = self.row_lo
+        row_hi = self.row_hi
+        # Columns open on this row (not used, not touching the Q above),
+        # and on the rows below (not used); computed once per row
+        open_now = ~(self.used_cols | prev_mask | (prev_mask << 1) | (prev_mask >> 1))
+        open_later = ~self.used_cols
+
+        domain = [0] * n
+        now = [0] * n  # each region's open columns on this row
+        forced = -1
+        for rid in range(n):
+            if used_regions >> rid & 1:
                 continue
+            hi = row_hi[rid]
+            if hi < row:
+                return []
+            if hi == row:
+                if forced >= 0:
+                    return []
+                forced = rid
+            base = rid * n
+            now[rid] = region_rows[base + row] & open_now
+            size = bin(now[rid]).count("1")
+            for r in range(max(row + 1, row_lo[rid]), hi + 1):
+                size += bin(region_rows[base + r] & open_later).count("1")
+            if size == 0:
+                return []
+            domain[rid] = size
+
+        # Walk only the set bits of each region's open columns
+        cands = []
+        for rid in (range(n) if forced < 0 else (forced,)):
+            cols = now[rid]
+            while cols:
+                low = cols & -cols
+                cands.append((domain[rid], low.bit_length() - 1))
+                cols ^= low
+        cands.sort()
+        return [col for _, col in cands]
 
-            # Place Q
-            self.solution[row] = col
-            self.used_cols.add(col)
-            self.used_regions.add(region_id)
-            self.queen_positions.append((row, col))
-
-            if self.backtrack(row + 1):
-                return True
-
-            # Undo place
-            self.solution[row] = None
-            self.used_cols.remove(col)
-            self.used_regions.remove(region_id)
-            self.queen_positions.pop()
-
-        return False
+    # Backtracking algo to get a solution
+    # Iterative: order[row] holds the row's candidate columns and pos[row] the
+    # next one to try, so a dead end just steps back a row and moves on there.
+    # Every CHECK_EVERY nodes it asks should_stop whether to give up early.
+    def backtrack(self):
+        n = self.n
+        rbits = self.rbits
+        solution = self.solution
+        dead = self.dead
+        should_stop = self.should_stop
+        order = [None] * n
+        pos = [0] * n
+        row = 0
+        nodes = 0
+        order[0] = self.candidates(0, 0)
+        while True:
+            nodes += 1
+            if should_stop is not None and nodes % self.CHECK_EVERY == 0 and should_stop():
+                return False
+            if pos[row] < len(order[row]):
+                # Place Q and move on to the next row
+                col = order[row][pos[row]]
+                pos[row] += 1
+                bit = 1 << col
+                solution[row] = col
+                self.used_cols ^= bit
+                self.used_regions ^= rbits[row * n + col]
+                row += 1
+                if row == n:
+                    return True
+                if (self.used_cols, self.used_regions, bit) in dead:
+                    order[row] = ()
+                else:
+                    order[row] = self.candidates(row, bit)
+                pos[row] = 0
+            else:
+                # Dead end: no Q fits in this row
+                if row == 0:
+                    return False
+                if len(dead) < self.MAX_DEAD_ENDS:
+                    dead.add((self.used_cols, self.used_regions, 1 << solution[row - 1]))
+                # Undo place in the row above and try its next candidate
+                row -= 1
+                col = solution[row]
+                solution[row] = None
+                self.used_cols ^= 1 << col
+                self.used_regions ^= rbits[row * n + col]
 
     def solve(self):
-        if self.backtrack(0):
+        if self.rbits is None:
+            return None
+        if self.backtrack():
             return list(self.solution)
         return None
 
 
+# Runs a QueensSolver off the GUI thread and emits its solution (or None).
+# Uses the compiled kernel when numba is available. requestInterruption()
+# stops the Python search and suppresses done; the compiled kernel can't be
+# interrupted, so a cancelled kernel solve runs to the end (without emitting).
+class SolveWorker(QThread):
+    done = pyqtSignal(object)
+
+    def __init__(self, solver):
+        super().__init__()
+        self.solver = solver
+
+    def run(self):
+        solver = self.solver
+        # The kernel uses int64 masks, so bigger boards stay in Python
+        if (_solve_kernel is not None and solver.rbits is not None
+                and solver.n <= QueensSolver.MAX_PACKED):
+            solution = _solve_kernel(solver.n,
+                                     np.frombuffer(solver.rbits, dtype=np.int64),
+                                     np.frombuffer(solver.region_rows, dtype=np.int64),
+                                     np.frombuffer(solver.row_lo, dtype=np.int64),
+                                     np.frombuffer(solver.row_hi, dtype=np.int64))
+            solution = solution.tolist() if len(solution) else None
+        else:
+            solver.should_stop = self.isInterruptionRequested
+            solution = solver.solve()
+        if not self.isInterruptionRequested():
+            self.done.emit(solution)
+
+
 # A subclass of QTableWidget to support "click‐and‐drag" painting of cells.
 class RegionTable(QTableWidget):
 
@@ -104,6 +240,19 @@ class QueensWindow(QWidget):
 
     CELL_SIZE = 40  # size (px) of each cell
 
+    # Table-wide cell style: white bg with 1px lightgray borders, and a black
+    # border on any edge whose dynamic property is set to true.
+    # Parsed once per grid; a cell's own stylesheet only carries its region color.
+    CELL_STYLE = """
+        QLabel { background-color: white; border: 1px solid lightgray; }
+        QLabel[top="true"] { border-top: 1px solid black; }
+        QLabel[right="true"] { border-right: 1px solid black; }
+        QLabel[bottom="true"] { border-bottom: 1px solid black; }
+        QLabel[left="true"] { border-left: 1px solid black; }
+        QLabel[crown="true"] { color: black; }
+    """
+    EDGES = ("top", "right", "bottom", "left")
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Queens Solver")
@@ -159,11 +308,28 @@ class QueensWindow(QWidget):
 
         # Track internal state
         self.n = 0
-        self.region_ids = []       # 2D array of integers (0 until assigned)
+        self.region_ids = array("h")  # flat n*n region ids, [r * n + c] (0 until assigned)
         self.region_colors = []    # 2D array of hex‐strings for background
+        self.border_flags = []     # 2D array of (top, right, bottom, left) black-edge flags
+        self.cells_in_region = defaultdict(int)  # region id -> # of cells painted
+        self.cells_assigned_total = 0            # # of cells with a region
         self.regions_defined = 0   # # of regions that are started so far
         self.current_region_id = None
         self.current_color = None  
+        self.worker = None         # SolveWorker while a solve is running
+        self._crown_font = QFont("Arial", int(self.CELL_SIZE / 1.5))
+
+        # Cells painted since the last flush; drag events are coalesced and
+        # restyled at most once per frame (~16 ms)
+        self._pending = set()
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(16)
+        self._flush_timer.timeout.connect(self._flush_paint)
+
+        # Compile the solver kernel now rather than on the first solve
+        if _solve_kernel is not None:
+            warmup_queens()
 
     # Create an empty n×n RegionTable with white QLabel‐cells,
     # disable the default gridlines (we'll draw our own),
@@ -179,13 +345,18 @@ class QueensWindow(QWidget):
             return
 
         self.n = n
-        self.region_ids = [[0] * n for _ in range(n)]
+        self.region_ids = array("h", [0]) * (n * n)
         self.region_colors = [["white"] * n for _ in range(n)]
+        self.border_flags = [[(False,) * 4] * n for _ in range(n)]
+        self.cells_in_region = defaultdict(int)
+        self.cells_assigned_total = 0
         self.regions_defined = 0
         self.current_region_id = None
         self.current_color = None
         self.current_label.setText("No region")
         self.current_label.setStyleSheet("color: black;")
+        self._pending.clear()
+        self._flush_timer.stop()
 
         # Delete any existing table
         if self.table:
@@ -200,20 +371,19 @@ class QueensWindow(QWidget):
         self.table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.table.setSelectionMode(QTableWidget.NoSelection)
         self.table.setShowGrid(False)  # disable default gridlines
+        self.table.setStyleSheet(self.CELL_STYLE)
+        self.table.horizontalHeader().setDefaultSectionSize(self.CELL_SIZE)
+        self.table.verticalHeader().setDefaultSectionSize(self.CELL_SIZE)
 
-        # Populate cells with QLabel widgets
+        # Populate cells with QLabel widgets, with repaints held off until
+        # the whole grid is in place
+        self.table.setUpdatesEnabled(False)
         for r in range(n):
-            self.table.setRowHeight(r, self.CELL_SIZE)
             for c in range(n):
-                self.table.setColumnWidth(c, self.CELL_SIZE)
                 label = QLabel()
                 label.setAlignment(Qt.AlignCenter)
-                # Initial style: white bg, 1px lightgray border on all sides
-                label.setStyleSheet(
-                    "background-color: white; "
-                    "border: 1px solid lightgray;"
-                )
                 self.table.setCellWidget(r, c, label)
+        self.table.setUpdatesEnabled(True)
 
         # Insert table into layout
         self.layout().addWidget(self.table)
@@ -253,11 +423,7 @@ class QueensWindow(QWidget):
             return
 
         # Verify at least one cell was assigned this region
-        found = any(
-            self.region_ids[r][c] == self.current_region_id
-            for r in range(self.n) for c in range(self.n)
-        )
-        if not found:
+        if self.cells_in_region[self.current_region_id] == 0:
             QMessageBox.warning(self, "Warning", "You must paint at least one cell for this region.")
             return
 
@@ -269,79 +435,96 @@ class QueensWindow(QWidget):
         self.done_region_button.setEnabled(False)
         self.add_region_button.setEnabled(True)
 
-        # Re‐draw all borders to outline each region
+        # Apply any painting still waiting on the timer, then
+        # re‐draw all borders to outline each region
+        self._flush_paint()
         self.update_all_borders()
 
         # Check if all cells have nonzero region_id
-        all_assigned = all(
-            self.region_ids[r][c] != 0
-            for r in range(self.n) for c in range(self.n)
-        )
-        if all_assigned:
+        if self.cells_assigned_total == self.n * self.n:
             self.solve_button.setEnabled(True)
 
     def paint_cell(self, row, col):
         if self.current_region_id is None:
             return
-        if self.region_ids[row][col] != 0:
+        if self.region_ids[row * self.n + col] != 0:
             return
 
-        # Assign region ID and color
-        self.region_ids[row][col] = self.current_region_id
+        # Assign region ID and color; restyling waits for the next flush
+        self.region_ids[row * self.n + col] = self.current_region_id
         self.region_colors[row][col] = self.current_color.name()
-        widget = self.table.cellWidget(row, col)
-        widget.setStyleSheet(f"background-color: {self.current_color.name()};")
+        self.cells_in_region[self.current_region_id] += 1
+        self.cells_assigned_total += 1
+        self._pending.add((row, col))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    # Restyle every cell painted since the last flush
+    def _flush_paint(self):
+        self._flush_timer.stop()
+        dirty = set()
+        for row, col in self._pending:
+            widget = self.table.cellWidget(row, col)
+            widget.setStyleSheet(f"background-color: {self.region_colors[row][col]};")
+            # Borders can change on this cell and its neighbors only
+            dirty.add((row, col))
+            for r, c in ((row - 1, col), (row, col + 1), (row + 1, col), (row, col - 1)):
+                if 0 <= r < self.n and 0 <= c < self.n:
+                    dirty.add((r, c))
+        self._pending.clear()
+
+        for r, c in dirty:
+            self._restyle_cell(r, c)
+
+    # Flag each edge of (r, c) that borders another region (or the grid's
+    # outside), re-polishing the cell only if its flags changed
+    def _restyle_cell(self, r, c):
+        n = self.n
+        ids = self.region_ids
+        i = r * n + c
+        rid = ids[i]
+        flags = (
+            r == 0 or ids[i - n] != rid,          # top
+            c == n - 1 or ids[i + 1] != rid,      # right
+            r == n - 1 or ids[i + n] != rid,      # bottom
+            c == 0 or ids[i - 1] != rid,          # left
+        )
+        if flags == self.border_flags[r][c]:
+            return
+        self.border_flags[r][c] = flags
 
-        # Re‐draw borders (light‐gray gridlines + black region borders)
-        self.update_all_borders()
+        widget = self.table.cellWidget(r, c)
+        for edge, black in zip(self.EDGES, flags):
+            widget.setProperty(edge, black)
+        widget.style().unpolish(widget)
+        widget.style().polish(widget)
 
-    # Loop through cells and assign a stylesheet that
-    # Sets the background to the region's color and paints region edges
+    # Re-check every cell's borders
     def update_all_borders(self):
         for r in range(self.n):
             for c in range(self.n):
-                rid = self.region_ids[r][c]
-                bgcolor = self.region_colors[r][c]
-                borders = []
-
-                # Top edge
-                if r == 0 or self.region_ids[r - 1][c] != rid:
-                    borders.append("border-top: 1px solid black;")
-                else:
-                    borders.append("border-top: 1px solid lightgray;")
-
-                # Right edge
-                if c == self.n - 1 or self.region_ids[r][c + 1] != rid:
-                    borders.append("border-right: 1px solid black;")
-                else:
-                    borders.append("border-right: 1px solid lightgray;")
-
-                # Bottom edge
-                if r == self.n - 1 or self.region_ids[r + 1][c] != rid:
-                    borders.append("border-bottom: 1px solid black;")
-                else:
-                    borders.append("border-bottom: 1px solid lightgray;")
-
-                # Left edge
-                if c == 0 or self.region_ids[r][c - 1] != rid:
-                    borders.append("border-left: 1px solid black;")
-                else:
-                    borders.append("border-left: 1px solid lightgray;")
-
-                style = f"background-color: {bgcolor}; {' '.join(borders)}"
-                widget = self.table.cellWidget(r, c)
-                widget.setStyleSheet(style)
+                self._restyle_cell(r, c)
 
     def run_solver(self):
         # Double‐check all cells are assigned to a region
-        for r in range(self.n):
-            for c in range(self.n):
-                if self.region_ids[r][c] == 0:
-                    QMessageBox.critical(self, "Error", "All cells must be assigned to a region.")
-                    return
+        if self.cells_assigned_total != self.n * self.n:
+            QMessageBox.critical(self, "Error", "All cells must be assigned to a region.")
+            return
 
-        solver = QueensSolver(self.n, self.region_ids)
-        solution = solver.solve()
+        # Solve in the background; the grid can't be rebuilt until it's done
+        self.solve_button.setEnabled(False)
+        self.init_button.setEnabled(False)
+        self.worker = SolveWorker(QueensSolver(self.n, self.region_ids))
+        self.worker.done.connect(self._render_solution)
+        self.worker.start()
+
+    def _render_solution(self, solution):
+        if self.worker is None:    # window closed while the result was queued
+            return
+        self.worker.wait()
+        self.worker = None
+        self.solve_button.setEnabled(True)
+        self.init_button.setEnabled(True)
 
         if solution is None:
             QMessageBox.information(
@@ -352,13 +535,22 @@ class QueensWindow(QWidget):
             return
 
         # Display queens
-        crown_font = QFont("Arial", int(self.CELL_SIZE / 1.5))
         for r, c in enumerate(solution):
             widget = self.table.cellWidget(r, c)
             widget.setText("👑")
-            widget.setFont(crown_font)
-            widget.setAlignment(Qt.AlignCenter)
-            widget.setStyleSheet(widget.styleSheet() + "color: black;")
+            widget.setFont(self._crown_font)
+            widget.setProperty("crown", True)
+            widget.style().unpolish(widget)
+            widget.style().polish(widget)
+
+    # A running QThread must not be destroyed with the window, so cancel the
+    # solve and wait for it (for the compiled kernel, until it finishes)
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.requestInterruption()
+            self.worker.wait()
+            self.worker = None
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,376 @@
+# Numba-compiled versions of the solver hot loops.
+# Importing this module requires numba (and numpy); callers fall back to the
+# pure-Python solvers when the import fails.
+
+import numpy as np
+from numba import njit, types
+from numba.typed import Dict
+
+MAX_DEAD_ENDS = 1_000_000  # same cap as QueensSolver.MAX_DEAD_ENDS
+_STATE = types.UniTuple(types.int64, 3)
+
+
+@njit(cache=True, nogil=True)
+def _popcount(x):
+    count = 0
+    while x:
+        x &= x - 1
+        count += 1
+    return count
+
+
+# Mirrors QueensSolver.candidates: fills out[] with the row's candidate
+# columns, most constrained region first, and returns how many there are
+# (0 if forward checking finds a region with no cells left).
+@njit(cache=True, nogil=True)
+def _queens_candidates(n, row, prev_mask, used_cols, used_regions,
+                       region_rows, row_lo, row_hi, domain, out):
+    open_now = ~(used_cols | prev_mask | (prev_mask << 1) | (prev_mask >> 1))
+    open_later = ~used_cols
+
+    forced = -1
+    for rid in range(n):
+        if used_regions >> rid & 1:
+            continue
+        hi = row_hi[rid]
+        if hi < row:
+            return 0
+        if hi == row:
+            if forced >= 0:
+                return 0
+            forced = rid
+        base = rid * n
+        size = _popcount(region_rows[base + row] & open_now)
+        for r in range(max(row + 1, row_lo[rid]), hi + 1):
+            size += _popcount(region_rows[base + r] & open_later)
+        if size == 0:
+            return 0
+        domain[rid] = size
+
+    # Insertion sort on (domain, col), encoded as domain * n + col
+    count = 0
+    for rid in range(n):
+        if used_regions >> rid & 1 or (forced >= 0 and rid != forced):
+            continue
+        cols = region_rows[rid * n + row] & open_now
+        for col in range(n):
+            if cols >> col & 1:
+                key = domain[rid] * n + col
+                i = count
+                while i > 0 and out[i - 1] > key:
+                    out[i] = out[i - 1]
+                    i -= 1
+                out[i] = key
+                count += 1
+    for i in range(count):
+        out[i] %= n
+    return count
+
+
+# Queens backtracker over the buffers QueensSolver builds (rbits,
+# region_rows, row_lo, row_hi).
+# Same search as QueensSolver, returns the column of the Q in each
+# row, or an empty array if no placement exists. Releases the GIL so the GUI
+# keeps running while it searches on a worker thread.
+@njit(cache=True, nogil=True)
+def _solve_kernel(n, rbits, region_rows, row_lo, row_hi):
+    sol = np.empty(n, np.int8)
+    order = np.empty((n, n), np.int64)
+    count = np.zeros(n, np.int64)
+    pos = np.zeros(n, np.int64)
+    domain = np.zeros(n, np.int64)
+    dead = Dict.empty(key_type=_STATE, value_type=types.boolean)
+    used_cols = 0
+    used_regions = 0
+    row = 0
+    count[0] = _queens_candidates(n, 0, 0, used_cols, used_regions,
+                                  region_rows, row_lo, row_hi, domain, order[0])
+    while True:
+        if pos[row] < count[row]:
+            # Place Q and move on to the next row
+            col = order[row, pos[row]]
+            pos[row] += 1
+            bit = 1 << col
+            sol[row] = col
+            used_cols ^= bit
+            used_regions ^= rbits[row * n + col]
+            row += 1
+            if row == n:
+                return sol
+            if (used_cols, used_regions, bit) in dead:
+                count[row] = 0
+            else:
+                count[row] = _queens_candidates(n, row, bit, used_cols, used_regions,
+                                                region_rows, row_lo, row_hi, domain, order[row])
+            pos[row] = 0
+        else:
+            # Dead end: undo the Q in the row above and try its next candidate
+            if row == 0:
+                return np.empty(0, np.int8)
+            if len(dead) < MAX_DEAD_ENDS:
+                dead[(used_cols, used_regions, 1 << sol[row - 1])] = True
+            row -= 1
+            col = sol[row]
+            used_cols ^= 1 << col
+            used_regions ^= rbits[row * n + col]
+
+
+# Mirrors TangoSolver._line_ok
+@njit(cache=True, nogil=True)
+def _line_ok(suns, moons, half):
+    return (_popcount(suns) <= half and _popcount(moons) <= half
+            and not suns & (suns >> 1) & (suns >> 2)
+            and not moons & (moons >> 1) & (moons >> 2))
+
+
+# Mirrors TangoSolver._valid for the filled square (r, c)
+@njit(cache=True, nogil=True)
+def _tango_square_ok(n, half, b, cons, sr, mr, sc, mc, r, c):
+    if not (_line_ok(sr[r], mr[r], half) and _line_ok(sc[c], mc[c], half)):
+        return False
+    v = b[r * n + c]
+    for k in range(4):
+        rel = cons[r, c, k]
+        if rel < 0:
+            continue
+        nr = r + (1 if k == 1 else -1 if k == 3 else 0)
+        nc = c + (1 if k == 0 else -1 if k == 2 else 0)
+        other = b[nr * n + nc]
+        if other >= 0 and (other == v) != (rel == 1):
+            return False
+    return True
+
+
+# Tango backtracker over a flat n*n board (1 = SUN, 0 = MOON, -1 = empty)
+# and an [n, n, 4] table of each square's constraint towards (r, c+1),
+# (r+1, c), (r, c-1), (r-1, c): -1 none, 0 "x", 1 "=". Fills empty squares
+# in row-major order with the same row/col/constraint checks as TangoSolver
+# (the givens are checked once up front); returns the filled board, or an
+# empty array if there is no solution.
+@njit(cache=True, nogil=True)
+def _tango_kernel(n, board, cons):
+    half = n // 2
+    b = board.copy()
+    sr = np.zeros(n, np.int64)
+    mr = np.zeros(n, np.int64)
+    sc = np.zeros(n, np.int64)
+    mc = np.zeros(n, np.int64)
+    empties = np.empty(n * n, np.int64)
+    m = 0
+    for i in range(n * n):
+        r, c = i // n, i % n
+        if b[i] == 1:
+            sr[r] |= 1 << c
+            sc[c] |= 1 << r
+        elif b[i] == 0:
+            mr[r] |= 1 << c
+            mc[c] |= 1 << r
+        else:
+            empties[m] = i
+            m += 1
+    for i in range(n * n):
+        r, c = i // n, i % n
+        if b[i] >= 0 and not _tango_square_ok(n, half, b, cons, sr, mr, sc, mc, r, c):
+            return np.empty(0, np.int8)
+
+    # tried[d]: how many values the d-th empty square has been given so far
+    tried = np.zeros(m, np.int8)
+    d = 0
+    while d >= 0:
+        if d == m:
+            return b
+
+        i = empties[d]
+        r, c = i // n, i % n
+        # Clear whatever this square held on the previous visit
+        if b[i] == 1:
+            sr[r] ^= 1 << c
+            sc[c] ^= 1 << r
+        elif b[i] == 0:
+            mr[r] ^= 1 << c
+            mc[c] ^= 1 << r
+        b[i] = -1
+        if tried[d] == 2:
+            tried[d] = 0
+            d -= 1
+            continue
+
+        v = 1 if tried[d] == 0 else 0
+        tried[d] += 1
+        b[i] = v
+        if v == 1:
+            sr[r] |= 1 << c
+            sc[c] |= 1 << r
+        else:
+            mr[r] |= 1 << c
+            mc[c] |= 1 << r
+
+        if _tango_square_ok(n, half, b, cons, sr, mr, sc, mc, r, c):
+            d += 1
+    return np.empty(0, np.int8)
+
+
+# Fills out[] with the open neighbors of (r, c) as r * W + c, in
+# ZipSolver.DIRS order (up, down, left, right), and returns how many. With
+# free set, only unvisited neighbors count.
+@njit(cache=True, nogil=True)
+def _zip_neigh(r, c, bh, bv, visited, free, out):
+    H, W = visited.shape
+    count = 0
+    for k in range(4):
+        nr = r + (-1 if k == 0 else 1 if k == 1 else 0)
+        nc = c + (-1 if k == 2 else 1 if k == 3 else 0)
+        if not (0 <= nr < H and 0 <= nc < W):
+            continue
+        if k < 2:
+            if bh[min(r, nr) + 1, c]:
+                continue
+        elif bv[r, min(c, nc) + 1]:
+            continue
+        if free and visited[nr, nc]:
+            continue
+        out[count] = nr * W + nc
+        count += 1
+    return count
+
+
+# Mirrors ZipSolver._coverable: all unvisited cells reachable from the head
+# (r, c), with at most one dead end among them. stack is scratch space.
+@njit(cache=True, nogil=True)
+def _zip_coverable(r, c, remaining, bh, bv, visited, stack):
+    H, W = visited.shape
+    head = r * W + c
+    seen = visited.copy()
+    nb = np.empty(4, np.int64)
+    stack[0] = head
+    top = 1
+    reached = 0
+    dead_ends = 0
+    while top > 0:
+        top -= 1
+        cell = stack[top]
+        exits = 0
+        for j in range(_zip_neigh(cell // W, cell % W, bh, bv, visited, False, nb)):
+            other = nb[j]
+            if other == head:
+                exits += 1
+            elif not visited[other // W, other % W]:
+                exits += 1
+                if not seen[other // W, other % W]:
+                    seen[other // W, other % W] = 1
+                    stack[top] = other
+                    top += 1
+                    reached += 1
+        if cell != head and exits < 2:
+            dead_ends += 1
+            if dead_ends > 1:
+                return False
+    return reached == remaining
+
+
+# Zip path search over numbers (-1 = no number) and the barrier grids, with
+# the same move order and pruning as ZipSolver._dfs: returns the path as an
+# array of (r, c) rows, or an empty array if there is none.
+@njit(cache=True, nogil=True)
+def _zip_kernel(numbers, bh, bv, start_r, start_c, max_num):
+    H, W = numbers.shape
+    total = H * W
+    path = np.empty((total, 2), np.int64)
+    expected = np.empty(total, np.int64)  # next number to hit after each step
+    order = np.empty((total, 4), np.int64)  # moves to try from each step
+    count = np.zeros(total, np.int64)
+    nxt = np.zeros(total, np.int64)         # next entry of order[] to try
+    degree = np.empty(4, np.int64)
+    nb = np.empty(4, np.int64)
+    stack = np.empty(total, np.int64)
+    visited = np.zeros((H, W), np.int8)
+
+    e = 1
+    if numbers[start_r, start_c] >= 0:
+        if numbers[start_r, start_c] != e:
+            return np.empty((0, 2), np.int64)
+        e += 1
+    path[0, 0], path[0, 1] = start_r, start_c
+    if total == 1:
+        return path if e - 1 == max_num else np.empty((0, 2), np.int64)
+    visited[start_r, start_c] = 1
+    length = 1
+    r, c = start_r, start_c
+
+    while True:
+        # (r, c) was just pushed as path[length - 1] with e numbers hit
+        d = length - 1
+        count[d] = 0
+        if _zip_coverable(r, c, total - length, bh, bv, visited, stack):
+            # Order moves by free degree (Warnsdorff), ties in DIRS order
+            m = _zip_neigh(r, c, bh, bv, visited, True, order[d])
+            for j in range(m):
+                cell = order[d, j]
+                key = _zip_neigh(cell // W, cell % W, bh, bv, visited, True, nb)
+                i = j
+                while i > 0 and degree[i - 1] > key:
+                    degree[i] = degree[i - 1]
+                    order[d, i] = order[d, i - 1]
+                    i -= 1
+                degree[i] = key
+                order[d, i] = cell
+            count[d] = m
+        expected[d] = e
+        nxt[d] = 0
+
+        # Take the next untried move, backing up when a step has none left
+        pushed = False
+        while length > 0 and not pushed:
+            d = length - 1
+            if nxt[d] == count[d]:
+                visited[path[d, 0], path[d, 1]] = 0
+                length -= 1
+                continue
+            cell = order[d, nxt[d]]
+            nxt[d] += 1
+            nr, nc = cell // W, cell % W
+            e = expected[d]
+            if numbers[nr, nc] >= 0:
+                if numbers[nr, nc] != e:
+                    continue
+                e += 1
+            path[length, 0], path[length, 1] = nr, nc
+            if length + 1 == total:
+                if e - 1 == max_num:
+                    return path
+                continue
+            visited[nr, nc] = 1
+            length += 1
+            r, c = nr, nc
+            pushed = True
+        if not pushed:
+            return np.empty((0, 2), np.int64)
+
+
+# Run a kernel once on a tiny board so the JIT cost is paid up front
+# instead of on the first Solve click.
+def warmup_queens():
+    # 4x4 board split into four 2x2 regions
+    rbits = np.array([1, 1, 2, 2,
+                      1, 1, 2, 2,
+                      4, 4, 8, 8,
+                      4, 4, 8, 8], dtype=np.int64)
+    region_rows = np.array([3, 3, 0, 0,
+                            12, 12, 0, 0,
+                            0, 0, 3, 3,
+                            0, 0, 12, 12], dtype=np.int64)
+    row_lo = np.array([0, 0, 2, 2], dtype=np.int64)
+    row_hi = np.array([1, 1, 3, 3], dtype=np.int64)
+    _solve_kernel(4, rbits, region_rows, row_lo, row_hi)
+
+
+def warmup_tango():
+    cons = np.full((2, 2, 4), -1, np.int8)
+    _tango_kernel(2, np.full(4, -1, np.int8), cons)
+
+
+def warmup_zip():
+    numbers = np.array([[1, -1], [-1, 2]], dtype=np.int16)
+    bh = np.zeros((3, 2), np.int8)
+    bv = np.zeros((2, 3), np.int8)
+    _zip_kernel(numbers, bh, bv, 0, 0, 2)
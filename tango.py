@@ -1,12 +1,18 @@
 import sys
 from typing import Dict, List, Optional, Tuple
 
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor, QFont
-from PyQt5.QtWidgets import QApplication, QFrame, QGridLayout, QHBoxLayout, QLabel, QMessageBox, QPushButton, QVBoxLayout, QWidget
+from PyQt5.QtCore import QRect, Qt
+from PyQt5.QtGui import QColor, QFont, QPainter
+from PyQt5.QtWidgets import QApplication, QHBoxLayout, QMessageBox, QPushButton, QVBoxLayout, QWidget
 
 from utils import create_back_button
 
+try:
+    import numpy as np
+    from solver_kernel import _tango_kernel, warmup_tango
+except ImportError:  # numba not installed, use the pure-Python solver
+    _tango_kernel = None
+
 # Constants and icons
 BOARD_SIZE = 6           
 CELL_PX = 56                # pixel size of each square
@@ -14,54 +20,97 @@ LINE_PX = 12                # grid line has to be thick enough to click and disp
 LINE_COLOR = "#e6ddc6"      # subtle beige
 EDGE_HITBOX = LINE_PX       # match hitbox to line thickness
 SUN, MOON = 1, 0
+EMPTY = 2                   # empty square in TangoSolver's flat board
 SYMBOLS = {None: "", SUN: "☀", MOON: "🌙"}
+_CYCLE = {None: "=", "=": "x", "x": None}   # what clicking an edge turns it into
 
 # ConstraintKey is a tuple of two tuples, each representing a square of the board
 ConstraintKey = Tuple[Tuple[int, int], Tuple[int, int]]
 
 def key_of(a: Tuple[int, int], b: Tuple[int, int]) -> ConstraintKey:
     # Canonicalise cell pair so (p,q) == (q,p)
-    return tuple(sorted((a, b)))
+    return (a, b) if a <= b else (b, a)
 
 class TangoSolver:
     # Initialize the solver with the board size, board state, and constraints
+    # The board is one flat bytearray, square (r, c) at r * n + c. Each row
+    # and col also keeps a SUN and a MOON bitmask (bit i set = square i holds
+    # that symbol), updated as squares are placed
     def __init__(self, n: int, board, constraints):
         self.n = n
         self.half = n // 2
-        self.b = [row[:] for row in board]
+        self.b = bytearray([EMPTY]) * (n * n)
         self.c = constraints.copy()
+        self.sr, self.mr = [0] * n, [0] * n
+        self.sc, self.mc = [0] * n, [0] * n
+        for r in range(n):
+            for c in range(n):
+                if board[r][c] is not None:
+                    self._place(r, c, board[r][c])
+
+        # Squares whose legal values can change when (r, c) is filled: the
+        # rest of its row and col, plus any square it shares a constraint with
+        self.peers = [[set() for _ in range(n)] for _ in range(n)]
+        for r in range(n):
+            for c in range(n):
+                peers = self.peers[r][c]
+                peers.update((r, i) for i in range(n))
+                peers.update((i, c) for i in range(n))
+                peers.discard((r, c))
+        # adj[r][c] lists (nr, nc, code) for each square constrained with
+        # (r, c), code 0 for "=" and 1 for "x"
+        self.adj = [[[] for _ in range(n)] for _ in range(n)]
+        for ((r1, c1), (r2, c2)), rel in self.c.items():
+            self.peers[r1][c1].add((r2, c2))
+            self.peers[r2][c2].add((r1, c1))
+            code = 0 if rel == "=" else 1
+            self.adj[r1][c1].append((r2, c2, code))
+            self.adj[r2][c2].append((r1, c1, code))
+
+    # Set square (r, c) to v (SUN, MOON or EMPTY), keeping the masks in sync.
+    # The hot methods below read attributes into locals once per call, and
+    # take SUN/MOON as default args, since local lookups are much cheaper.
+    def _place(self, r, c, v, SUN=SUN, MOON=MOON):
+        sr, mr, sc, mc = self.sr, self.mr, self.sc, self.mc
+        rbit, cbit = 1 << c, 1 << r
+        sr[r] &= ~rbit
+        mr[r] &= ~rbit
+        sc[c] &= ~cbit
+        mc[c] &= ~cbit
+        if v == SUN:
+            sr[r] |= rbit
+            sc[c] |= cbit
+        elif v == MOON:
+            mr[r] |= rbit
+            mc[c] |= cbit
+        self.b[r * self.n + c] = v
+
+    # Check that a line's SUN and MOON masks each fill at most half the line
+    # and never have three in a row
+    def _line_ok(self, suns, moons):
+        half = self.half
+        return (bin(suns).count("1") <= half and bin(moons).count("1") <= half
+                and not suns & (suns >> 1) & (suns >> 2)
+                and not moons & (moons >> 1) & (moons >> 2))
 
     # Check if a row has more than half its squares as sun or moon
     def _row_ok(self, r):
-        row = self.b[r]
-        if row.count(SUN) > self.half or row.count(MOON) > self.half:
-            return False
-        return all(row[i] == row[i + 1] == row[i + 2] is None or not (row[i] == row[i + 1] == row[i + 2]) for i in range(self.n - 2))
+        return self._line_ok(self.sr[r], self.mr[r])
 
     # Check if a col has more than half its squares as sun or moon
     def _col_ok(self, c):
-        col = [self.b[r][c] for r in range(self.n)]
-        if col.count(SUN) > self.half or col.count(MOON) > self.half:
-            return False
-        return all(col[i] == col[i + 1] == col[i + 2] is None or not (col[i] == col[i + 1] == col[i + 2]) for i in range(self.n - 2))
+        return self._line_ok(self.sc[c], self.mc[c])
 
     # Check if a given constraint is valid
-    def _constraint_ok(self, r, c):
-        # Check four directions (up, right, down, left)
-        for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0)):
-            nr, nc = r + dr, c + dc
-            if not (0 <= nr < self.n and 0 <= nc < self.n):
-                continue
-            k = key_of((r, c), (nr, nc))
-            if k not in self.c:
-                continue
-            a, b = self.b[r][c], self.b[nr][nc]
-            if a is None or b is None:
-                continue
-            rel = self.c[k]
-            if rel == "=" and a != b:
-                return False
-            if rel == "x" and a == b:
+    def _constraint_ok(self, r, c, EMPTY=EMPTY):
+        n, board = self.n, self.b
+        a = board[r * n + c]
+        if a == EMPTY:
+            return True
+        for nr, nc, code in self.adj[r][c]:
+            b = board[nr * n + nc]
+            # "=" (code 0) needs a == b, "x" (code 1) needs a != b
+            if b != EMPTY and (a != b) != code:
                 return False
         return True
 
@@ -69,25 +118,112 @@ class TangoSolver:
     def _valid(self, r, c):
         return self._row_ok(r) and self._col_ok(c) and self._constraint_ok(r, c)
 
-    # Solve the board using backtracking
-    def solve(self):
-        for r in range(self.n):
-            for c in range(self.n):
-                if self.b[r][c] is None:
-                    for v in (SUN, MOON):
-                        self.b[r][c] = v
-                        if self._valid(r, c):
-                            res = self.solve()
-                            if res is not None:
-                                return res
-                        self.b[r][c] = None
-                    return None
-                    
-        if any(row.count(SUN) != self.half for row in self.b):
-            return None
-        if any([self.b[r][c] for r in range(self.n)].count(SUN) != self.half for c in range(self.n)):
+    # Legal values for empty square (r, c) as a 2-bit mask (bit v set = v fits).
+    # Same checks as _valid, but run on the masks the row and col would have,
+    # so neither value has to be placed and cleared again
+    def _legal(self, r, c, SUN=SUN, MOON=MOON, EMPTY=EMPTY):
+        n, board, line_ok = self.n, self.b, self._line_ok
+        rbit, cbit = 1 << c, 1 << r
+        suns_r, moons_r, suns_c, moons_c = self.sr[r], self.mr[r], self.sc[c], self.mc[c]
+        mask = 0
+        if line_ok(suns_r | rbit, moons_r) and line_ok(suns_c | cbit, moons_c):
+            mask |= 1 << SUN
+        if line_ok(suns_r, moons_r | rbit) and line_ok(suns_c, moons_c | cbit):
+            mask |= 1 << MOON
+        for nr, nc, code in self.adj[r][c]:
+            b = board[nr * n + nc]
+            if b != EMPTY:
+                # "=" (code 0) only allows b, "x" (code 1) only the other value
+                mask &= 1 << (b ^ code)
+        return mask
+
+    # Fill (r, c) with v as part of the search, and queue its peers for
+    # another look since their legal values may have shrunk
+    def _assign(self, r, c, v, empties, trail, todo):
+        self._place(r, c, v)
+        empties.discard((r, c))
+        trail.append((r, c))
+        todo.update(self.peers[r][c] & empties)
+
+    # Assign every queued empty square that has a single legal value, until
+    # nothing more is forced. Returns False if some square has no legal value.
+    def _propagate(self, empties, trail, todo, SUN=SUN, MOON=MOON, EMPTY=EMPTY):
+        n, board = self.n, self.b
+        legal_of, assign = self._legal, self._assign
+        while todo:
+            r, c = todo.pop()
+            if board[r * n + c] != EMPTY:
+                continue
+            legal = legal_of(r, c)
+            if not legal:
+                todo.clear()
+                return False
+            if legal & (legal - 1) == 0:
+                assign(r, c, SUN if legal >> SUN & 1 else MOON, empties, trail, todo)
+        return True
+
+    # Solve the board using backtracking with constraint propagation.
+    # Iterative: trail lists squares in the order they were filled, and each
+    # guess pushes (trail length before it, r, c, value still to try) so a
+    # dead end undoes the trail back to the latest guess with a value left.
+    def solve(self, SUN=SUN, MOON=MOON, EMPTY=EMPTY):
+        n, board = self.n, self.b
+        sr, mr, sc, mc = self.sr, self.mr, self.sc, self.mc
+        place, assign, propagate = self._place, self._assign, self._propagate
+        # The search only checks the lines and constraints through the squares
+        # it fills, so check the given squares once up front. After that a
+        # full board can't break a rule: a full line with at most half of
+        # each symbol has exactly half.
+        if not all(self._valid(r, c) for r in range(n) for c in range(n)
+                   if board[r * n + c] != EMPTY):
             return None
-        return [row[:] for row in self.b]
+        empties = {(r, c) for r in range(n) for c in range(n) if board[r * n + c] == EMPTY}
+        todo = set(empties)
+        trail = []
+        guesses = []
+        while True:
+            if propagate(empties, trail, todo):
+                if not empties:
+                    return [list(board[r * n:(r + 1) * n]) for r in range(n)]
+                else:
+                    # After propagation every empty square still takes either
+                    # value, so guess in the one whose row and col are fullest
+                    r, c = min(empties, key=lambda rc: (
+                        -bin(sr[rc[0]] | mr[rc[0]]).count("1")
+                        - bin(sc[rc[1]] | mc[rc[1]]).count("1"), rc))
+                    guesses.append((len(trail), r, c, MOON))
+                    assign(r, c, SUN, empties, trail, todo)
+                    continue
+
+            # Dead end: undo back to the latest guess that has a value left
+            while guesses:
+                mark, r, c, v = guesses.pop()
+                while len(trail) > mark:
+                    tr, tc = trail.pop()
+                    place(tr, tc, EMPTY)
+                    empties.add((tr, tc))
+                if v is not None:
+                    guesses.append((mark, r, c, None))
+                    assign(r, c, v, empties, trail, todo)
+                    break
+            else:
+                return None
+
+# Solve with the compiled kernel, taking and returning boards in the same
+# format as TangoSolver
+def _kernel_solve(n: int, board, constraints):
+    flat = np.array([SUN if v == SUN else MOON if v == MOON else -1 for row in board for v in row], dtype=np.int8)
+    # Constraint keys come from key_of, so (r1, c1) is the top or left square
+    cons = np.full((n, n, 4), -1, np.int8)
+    for ((r1, c1), (r2, c2)), rel in constraints.items():
+        code = 1 if rel == "=" else 0
+        k = 0 if r1 == r2 else 1
+        cons[r1, c1, k] = code
+        cons[r2, c2, k + 2] = code
+    sol = _tango_kernel(n, flat, cons)
+    if not len(sol):
+        return None
+    return [[int(v) for v in sol[r * n:(r + 1) * n]] for r in range(n)]
 
 # GUI components
 
@@ -97,12 +233,18 @@ class Cell(QPushButton):
     # A single sun/moon/empty square.
     # Click on its edges once or twice to toggle the "=" or "x" constraint.
 
+    # Suns are drawn in red. Each setStyleSheet call makes Qt re-parse and
+    # re-polish, so it is only called when the style actually changes.
+    STYLE_DEFAULT = "background:#fff; border:none;"
+    STYLE_SUN = "background:#fff; border:none; color: red;"
+
     def __init__(self, r: int, c: int, parent: "TangoBoard"):
         super().__init__("", parent)
         self.r, self.c = r, c
         self.val: Optional[int] = None
         self.setFixedSize(CELL_PX, CELL_PX)
-        self.setStyleSheet("background:#fff; border:none;")
+        self._style = self.STYLE_DEFAULT
+        self.setStyleSheet(self._style)
         self.setFont(parent.big_font)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
         self.board = parent
@@ -116,13 +258,14 @@ class Cell(QPushButton):
             self.val = MOON
         else:
             self.val = None
+
+    # Show the symbol for self.val, colored by value
+    def show_val(self):
         self.setText(SYMBOLS[self.val])
-        # Update color based on value
-        if self.val == SUN:
-            self.setStyleSheet("background:#fff; border:none; color: red;")
-        else:
-            self.setStyleSheet("background:#fff; border:none;")
-        self.update()  
+        style = self.STYLE_SUN if self.val == SUN else self.STYLE_DEFAULT
+        if style != self._style:
+            self._style = style
+            self.setStyleSheet(style)
 
     def mousePressEvent(self, ev):  
         if ev.button() != Qt.MouseButton.LeftButton:
@@ -146,127 +289,101 @@ class Cell(QPushButton):
             self.val = MOON
         else:
             self._cycle_val()
-        self.setText(SYMBOLS[self.val])
-        # Update color based on value
-        if self.val == SUN:
-            self.setStyleSheet("background:#fff; border:none; color: red;")
-        else:
-            self.setStyleSheet("background:#fff; border:none;")
-        self.update()  # Force immediate update
-
-# A thin beige line that can be clicked to toggle constraints.
-class GridLine(QFrame):
-    def __init__(self, horiz: bool, parent: QWidget, grid_row: int, grid_col: int):
-        super().__init__(parent)
-        self.setStyleSheet(f"background:{LINE_COLOR}; border:none;")
-        self.setFixedSize(CELL_PX if horiz else LINE_PX, LINE_PX if horiz else CELL_PX)
-        self.horiz = horiz
-        self.grid_row = grid_row
-        self.grid_col = grid_col
-        self.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, False)
-
-    def mousePressEvent(self, ev):  
-        if ev.button() != Qt.MouseButton.LeftButton:
-            return super().mousePressEvent(ev)
-        
-        # Convert grid position to square coordinates
-        if self.horiz:
-            # For horizontal lines, connect squares in same col
-            row = self.grid_row // 2
-            col = self.grid_col // 2
-            self.parent().toggle_edge((row, col), (row + 1, col))
-        else:
-            # For vertical lines, connect squares in same row
-            row = self.grid_row // 2
-            col = self.grid_col // 2
-            self.parent().toggle_edge((row, col), (row, col + 1))
+        self.show_val()
 
 # Board class
 
+# The squares are Cell widgets placed at fixed positions, CELL_PX + LINE_PX
+# apart. The beige lines between them, and the "=" / "x" marks on those
+# lines, are painted by the board itself, which also handles clicks on them.
 class TangoBoard(QWidget):
+    STEP = CELL_PX + LINE_PX    # distance from one square to the next
+
     def __init__(self):
         super().__init__()
         self.constraints: Dict[ConstraintKey, str] = {}
         self.big_font = self.font()
         self.big_font.setPointSize(22)
+        self.line_color = QColor(LINE_COLOR)
 
-        layout = QGridLayout(self)
-        layout.setSpacing(0)
-        layout.setContentsMargins(0, 0, 0, 0)
+        n = BOARD_SIZE
+        side = n * CELL_PX + (n - 1) * LINE_PX
+        self.setFixedSize(side, side)
+        self.setCursor(Qt.CursorShape.PointingHandCursor)
 
         self.cells: List[List[Cell]] = []
-        n = BOARD_SIZE
         for r in range(n):
             row: List[Cell] = []
             for c in range(n):
                 cell = Cell(r, c, self)
-                layout.addWidget(cell, 2 * r, 2 * c)
+                cell.move(c * self.STEP, r * self.STEP)
                 row.append(cell)
-                # vertical line to the right (except last column)
+            self.cells.append(row)
+        # Row-major list of the same cells, for loops over the whole board
+        self.cells_flat: List[Cell] = [cell for row in self.cells for cell in row]
+
+        # Every line's rectangle: the vertical line to the right of each
+        # square (except last column), the horizontal line below it (except
+        # last row)
+        self.line_rects: List[QRect] = []
+        for r in range(n):
+            for c in range(n):
                 if c < n - 1:
-                    line = GridLine(False, self, 2 * r, 2 * c + 1)
-                    layout.addWidget(line, 2 * r, 2 * c + 1)
-                # horizontal line below (except last row)
+                    self.line_rects.append(self._line_rect((r, c), (r, c + 1)))
                 if r < n - 1:
-                    line = GridLine(True, self, 2 * r + 1, 2 * c)
-                    layout.addWidget(line, 2 * r + 1, 2 * c)
-            self.cells.append(row)
+                    self.line_rects.append(self._line_rect((r, c), (r + 1, c)))
+
+    # Rectangle of the line between neighboring squares a and b
+    def _line_rect(self, a: Tuple[int, int], b: Tuple[int, int]) -> QRect:
+        (r1, c1), (r2, c2) = key_of(a, b)
+        if r1 == r2:    # squares side by side, vertical line
+            return QRect(c1 * self.STEP + CELL_PX, r1 * self.STEP, LINE_PX, CELL_PX)
+        return QRect(c1 * self.STEP, r1 * self.STEP + CELL_PX, CELL_PX, LINE_PX)
+
+    def paintEvent(self, ev):
+        p = QPainter(self)
+        for rect in self.line_rects:
+            p.fillRect(rect, self.line_color)
+        p.setPen(Qt.GlobalColor.black)
+        p.setFont(self.font())
+        for (a, b), rel in self.constraints.items():
+            p.drawText(self._line_rect(a, b), Qt.AlignmentFlag.AlignCenter, rel)
+
+    # Clicks that land between squares toggle the constraint on that line
+    def mousePressEvent(self, ev):
+        if ev.button() != Qt.MouseButton.LeftButton:
+            return super().mousePressEvent(ev)
+        c, x = divmod(ev.pos().x(), self.STEP)
+        r, y = divmod(ev.pos().y(), self.STEP)
+        if x >= CELL_PX and y < CELL_PX and c < BOARD_SIZE - 1:
+            self.toggle_edge((r, c), (r, c + 1))
+        elif y >= CELL_PX and x < CELL_PX and r < BOARD_SIZE - 1:
+            self.toggle_edge((r, c), (r + 1, c))
 
     # Edge toggling
     def toggle_edge(self, a: Tuple[int, int], b: Tuple[int, int]):
         k = key_of(a, b)
-        rel = self.constraints.get(k)
-        rel = {None: "=", "=": "x", "x": None}[rel]
+        rel = _CYCLE[self.constraints.get(k)]
         if rel is None:
             self.constraints.pop(k, None)
         else:
             self.constraints[k] = rel
-        # display icon near middle of the line using QLabel overlay
-        self._paint_edge_label(a, b, rel)
-
-    def _paint_edge_label(self, a: Tuple[int, int], b: Tuple[int, int], rel: Optional[str]):
-        # find the line widget position in the layout and (re)label it
-        r1, c1 = a
-        r2, c2 = b
-        horiz = r1 == r2
-        row = 2 * r1 + (1 if not horiz else 0)
-        col = 2 * c1 + (1 if horiz else 0)
-        item = self.layout().itemAtPosition(row, col)
-        if item is None:
-            return
-        line_w = item.widget()  
-        # Remove previous label child, if any exists
-        for child in line_w.children():
-            if isinstance(child, QLabel):
-                child.deleteLater()
-        if rel is None:
-            return
-        lab = QLabel(rel, line_w)
-        lab.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        lab.setFont(self.font())
-        lab.setStyleSheet("color: black; background: transparent;")
-        lab.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
-        lab.raise_()  # Ensure the label is on top
-        lab.resize(line_w.size())
-        lab.show()
+        # repaint the line with its new icon
+        self.update(self._line_rect(a, b))
 
     # Utility functions
     def snapshot(self):
         return [[cell.val for cell in row] for row in self.cells]
 
     def clear(self):
-        for row in self.cells:
-            for cell in row:
-                cell.val = None
-                cell.setText("")
+        # Hold repaints until every square and label is cleared
+        self.setUpdatesEnabled(False)
+        for cell in self.cells_flat:
+            cell.val = None
+            cell.show_val()
         self.constraints.clear()
-        # Clear any edge labels
-        for i in range(self.layout().count()):
-            w = self.layout().itemAt(i).widget()
-            for child in w.children():
-                if isinstance(child, QLabel):
-                    child.deleteLater()
+        self.setUpdatesEnabled(True)
+        self.update()
 
 # Main window
 
@@ -294,23 +411,26 @@ class Main(QWidget):
         btns.addWidget(clr)
         v.addLayout(btns)
 
+        # Compile the solver kernel now rather than on the first solve
+        if _tango_kernel is not None:
+            warmup_tango()
+
     def _solve(self):
-        solver = TangoSolver(BOARD_SIZE, self.board.snapshot(), self.board.constraints)
-        sol = solver.solve()
+        if _tango_kernel is not None:
+            sol = _kernel_solve(BOARD_SIZE, self.board.snapshot(), self.board.constraints)
+        else:
+            solver = TangoSolver(BOARD_SIZE, self.board.snapshot(), self.board.constraints)
+            sol = solver.solve()
         if sol is None:
             QMessageBox.information(self, "Tango", "No solution found / invalid constraints.")
             return
-        for r, row in enumerate(sol):
-            for c, v in enumerate(row):
-                cell = self.board.cells[r][c]
-                cell.val = v
-                cell.setText(SYMBOLS[v])
-                # Apply red color for sun cells
-                if v == SUN:
-                    cell.setStyleSheet("background:#fff; border:none; color: red;")
-                else:
-                    cell.setStyleSheet("background:#fff; border:none;")
-                cell.update()
+        # Fill in the whole board, then repaint it once
+        self.board.setUpdatesEnabled(False)
+        for cell, v in zip(self.board.cells_flat, [v for row in sol for v in row]):
+            cell.val = v
+            cell.show_val()
+        self.board.setUpdatesEnabled(True)
+        self.board.update()
 
 # Run the app
 
@@ -3,12 +3,18 @@
 
 import sys
 from typing import List, Optional, Tuple, Dict, Set
-from PyQt5.QtCore import Qt, QRectF, QTimer
-from PyQt5.QtGui import QPainter, QPen, QBrush, QFont
+from PyQt5.QtCore import Qt, QRectF, QVariantAnimation
+from PyQt5.QtGui import QPainter, QPen, QBrush, QFont, QPixmap
 from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QHBoxLayout, QVBoxLayout, QLabel, QMessageBox, QLineEdit
 
 from utils import create_back_button
 
+try:
+    import numpy as np
+    from solver_kernel import _zip_kernel, warmup_zip
+except ImportError:  # numba not installed, use the pure-Python solver
+    _zip_kernel = None
+
 Coord = Tuple[int, int]
 
 # Depth-first back-tracking solver with simple pruning.
@@ -23,8 +29,12 @@ class ZipSolver:
     ):
         self.H, self.W = len(numbers), len(numbers[0])
         self.numbers = numbers
-        self.bh = barriers_h               # between rows r-1 and r
-        self.bv = barriers_v               # between cols c-1 and c
+        # Visited flags and neighbor lists are flat, with cell (r, c) at
+        # r * W + c, so each lookup is a single index. The barrier grids are
+        # flattened the same way, with rows of W and W + 1 entries.
+        W = self.W
+        self.bh = bytearray(v for row in barriers_h for v in row)   # between rows r-1 and r
+        self.bv = bytearray(v for row in barriers_v for v in row)   # between cols c-1 and c
         self.total = self.H * self.W
 
         self.start: Optional[Coord] = None
@@ -41,68 +51,128 @@ class ZipSolver:
             raise ValueError("Place a '1' on the grid before solving.")
 
         self._found_path: List[Coord] = []
-        self._visited = [[False] * self.W for _ in range(self.H)]
+        self._visited = bytearray(self.total)
+
+        # Barriers don't change during a solve, so list each cell's open
+        # neighbors (in DIRS order) once
+        self.nbrs: List[Tuple[int, ...]] = [
+            tuple(self._neigh(r, c)) for r in range(self.H) for c in range(W)
+        ]
 
     # Overarching solve function
     def solve(self) -> Optional[List[Coord]]:
-        self._dfs(self.start[0], self.start[1], 1, [])
+        self._dfs()
         return self._found_path or None
 
-    # Helper function: DFS to find a path that visits all cells in order
-    def _dfs(
-        self,
-        r: int,
-        c: int,
-        expected_num: int,          # next mandatory number to hit
-        path: List[Coord],
-    ):
-        if self._found_path:        # early exit once solution found
-            return
-        self._visited[r][c] = True
-        path.append((r, c))
-
-        cell_num = self.numbers[r][c]
-        if cell_num is not None:            # must match expectation
-            if cell_num != expected_num:
-                self._visited[r][c] = False
-                path.pop()
+    # Helper function: DFS to find a path that visits all cells in order.
+    # Iterative, so there is no Python frame per step: path[:length] is the
+    # current path, and frames[d] holds [moves from path[d], index of the
+    # next one to try, next mandatory number to hit after path[d]]
+    def _dfs(self):
+        total, visited, nbrs, W = self.total, self._visited, self.nbrs, self.W
+        numbers = [v for row in self.numbers for v in row]
+        path: List[int] = [0] * total
+        frames = [None] * total
+        length = 0
+        i = self.start[0] * W + self.start[1]
+        expected_num = 1
+        while True:
+            # Step onto cell i
+            cell_num = numbers[i]
+            if cell_num is None or cell_num == expected_num:  # must match expectation
+                next_num = expected_num if cell_num is None else expected_num + 1
+                path[length] = i
+                if length + 1 == total:                # all cells used?
+                    if next_num - 1 == self.max_num:
+                        self._found_path = [divmod(j, W) for j in path]
+                        return
+                else:
+                    visited[i] = 1
+                    length += 1
+                    # Prune if the cells left can't be covered by one path from here
+                    if self._coverable(i, length):
+                        # Warnsdorff's rule: try the neighbor with fewest free
+                        # neighbors first
+                        nexts = [j for j in nbrs[i] if not visited[j]]
+                        nexts.sort(key=self._free_degree)
+                    else:
+                        nexts = []
+                    frames[length - 1] = [nexts, 0, next_num]
+
+            # Take the next untried move, backing up from steps that have none left
+            while length:
+                frame = frames[length - 1]
+                nexts, k, expected_num = frame
+                if k < len(nexts):
+                    frame[1] = k + 1
+                    i = nexts[k]
+                    break
+                visited[path[length - 1]] = 0
+                length -= 1
+            else:
                 return
-            expected_num += 1               # next number to chase
-
-        # All cells used?
-        if len(path) == self.total:
-            if expected_num - 1 == self.max_num:
-                self._found_path = path.copy()
-            self._visited[r][c] = False
-            path.pop()
-            return
-
-        for nr, nc, kind in self._neigh(r, c):
-            if self._visited[nr][nc]:
-                continue
-            self._dfs(nr, nc, expected_num, path)
-            if self._found_path:
-                break
 
-        self._visited[r][c] = False
-        path.pop()
-
-    # Get neighbors of a cell (r, c)
+    # Number of unvisited neighbors of cell i
+    def _free_degree(self, i: int) -> int:
+        visited = self._visited
+        return sum(1 for j in self.nbrs[i] if not visited[j])
+
+    # Flood fill the unvisited cells from the path's head. A single path can
+    # only cover them if they are all reachable (so every remaining number is
+    # too) and at most one of them is a dead end, i.e. has only one
+    # unvisited-or-head neighbor, since only the path's last cell can be.
+    def _coverable(self, head: int, used: int) -> bool:
+        visited, nbrs = self._visited, self.nbrs
+        seen = bytearray(visited)
+        stack = [head]
+        reached = 0
+        dead_ends = 0
+        while stack:
+            i = stack.pop()
+            exits = 0
+            for j in nbrs[i]:
+                if j == head:
+                    exits += 1
+                elif not visited[j]:
+                    exits += 1
+                    if not seen[j]:
+                        seen[j] = 1
+                        stack.append(j)
+                        reached += 1
+            if i != head and exits < 2:
+                dead_ends += 1
+                if dead_ends > 1:
+                    return False
+        return reached == self.total - used
+
+    # Get the flat indices of the neighbors of a cell (r, c), used to build
+    # self.nbrs
     def _neigh(self, r: int, c: int):
+        W = self.W
         for dr, dc, etype in self.DIRS:
             nr, nc = r + dr, c + dc
-            if not (0 <= nr < self.H and 0 <= nc < self.W):
+            if not (0 <= nr < self.H and 0 <= nc < W):
                 continue
             # Is a barrier between (r,c) and (nr,nc)?
             if etype == "h":
                 row = min(r, nr) + 1
-                if self.bh[row][c]:
+                if self.bh[row * W + c]:
                     continue
             else:
                 col = min(c, nc) + 1
-                if self.bv[r][col]:
+                if self.bv[r * (W + 1) + col]:
                     continue
-            yield nr, nc, etype
+            yield nr * W + nc
+
+
+# Run a ZipSolver's search with the compiled kernel instead of _dfs
+def _kernel_solve(solver: ZipSolver) -> Optional[List[Coord]]:
+    H, W = solver.H, solver.W
+    numbers = np.array([[-1 if v is None else v for v in row] for row in solver.numbers], dtype=np.int16)
+    bh = np.frombuffer(solver.bh, dtype=np.int8).reshape(H + 1, W)
+    bv = np.frombuffer(solver.bv, dtype=np.int8).reshape(H, W + 1)
+    path = _zip_kernel(numbers, bh, bv, solver.start[0], solver.start[1], solver.max_num)
+    return [(r, c) for r, c in path.tolist()] or None
 
 
 # PyQt GUI
@@ -116,9 +186,8 @@ class GridWidget(QWidget):
     PAD = 40              # outer padding (pixels)
     CELL = 60             # square size  (pixels)
     BAR_W = 6             # barrier thickness
-    # The constants below determine the animation speed and smoothness respectively 
-    ANIMATION_SPEED = 5   # in ms
-    ANIMATION_STEPS = 10  
+    # The constant below determines the animation speed
+    SEGMENT_MS = 50       # time to draw each path segment (ms)
 
     def __init__(self, rows: int = GRID, cols: int = GRID):
         super().__init__()
@@ -133,30 +202,41 @@ class GridWidget(QWidget):
         self.bv = [[False] * (cols + 1) for _ in range(rows)]    # vert
         self.path: List[Coord] = []
         self.next_number = 1  # Track the next number to place
+        # Grid lines, barriers and numbers, drawn once into a transparent
+        # pixmap and reused until an edit or resize changes them
+        self._grid_cache: Optional[QPixmap] = None
         
-        # Animation state
-        self.animation_timer = QTimer(self)
-        self.animation_timer.timeout.connect(self._update_animation)
+        # Animation state: one run of _anim per segment, taking _progress
+        # from 0 to 1 on Qt's animation clock
+        self._anim = QVariantAnimation(self)
+        self._anim.setDuration(self.SEGMENT_MS)
+        self._anim.setStartValue(0.0)
+        self._anim.setEndValue(1.0)
+        self._anim.valueChanged.connect(self._set_progress)
+        self._anim.finished.connect(self._next_segment)
         self.animated_path: List[Coord] = []
         self.current_segment = 0
-        self.interpolation_step = 0
+        self._progress = 0.0
+
+    def _set_progress(self, value):
+        self._progress = value
+        self.update()
 
-    def _update_animation(self):
+    def _next_segment(self):
         if self.current_segment < len(self.path) - 1:
-            if self.interpolation_step < self.ANIMATION_STEPS:
-                self.interpolation_step += 1
-            else:
-                self.interpolation_step = 0
-                self.current_segment += 1
-            self.update()
-        else:
-            self.animation_timer.stop()
+            self.current_segment += 1
+            if self.current_segment < len(self.path) - 1:
+                self._progress = 0.0
+                self._anim.start()
+        self.update()
 
     def start_animation(self):
+        self._anim.stop()
         self.animated_path = []
         self.current_segment = 0
-        self.interpolation_step = 0
-        self.animation_timer.start(self.ANIMATION_SPEED)
+        self._progress = 0.0
+        if len(self.path) > 1:
+            self._anim.start()
 
     # Helper functions
 
@@ -199,6 +279,7 @@ class GridWidget(QWidget):
     # Mouse events
     def mousePressEvent(self, ev):
         self.path.clear()          # any click clears displayed path
+        self._grid_cache = None    # and may edit a barrier or number
         edge = self._closest_edge(ev.pos())
         if edge:
             kind, r, c = edge
@@ -258,7 +339,7 @@ class GridWidget(QWidget):
             if self.current_segment < len(self.path) - 1:
                 r0, c0 = self.path[self.current_segment]
                 r1, c1 = self.path[self.current_segment + 1]
-                progress = self.interpolation_step / self.ANIMATION_STEPS
+                progress = self._progress
                 
                 x0 = self.PAD + c0 * self.CELL + self.CELL / 2
                 y0 = self.PAD + r0 * self.CELL + self.CELL / 2
@@ -286,6 +367,25 @@ class GridWidget(QWidget):
                         int(self.PAD + r1 * self.CELL + self.CELL / 2),
                     )
 
+        # grid, barriers and numbers on top of the path
+        if self._grid_cache is None:
+            self._grid_cache = self._render_grid()
+        p.drawPixmap(0, 0, self._grid_cache)
+
+    def resizeEvent(self, ev):
+        self._grid_cache = None
+        super().resizeEvent(ev)
+
+    # Draw the parts of the board that only change on edits
+    def _render_grid(self) -> QPixmap:
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * dpr)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        p = QPainter(pixmap)
+        p.setRenderHint(QPainter.Antialiasing)
+        p.setRenderHint(QPainter.HighQualityAntialiasing)
+
         # grid lines
         thin_pen = QPen(Qt.black, 1)
         p.setPen(thin_pen)
@@ -330,6 +430,8 @@ class GridWidget(QWidget):
                         self.CELL,
                     )
                     p.drawText(rect, Qt.AlignCenter, str(v))
+        p.end()
+        return pixmap
 
     # Keyboard events
     def keyPressEvent(self, ev):
@@ -338,14 +440,17 @@ class GridWidget(QWidget):
         elif ev.key() == Qt.Key_C:
             self.path.clear()
             self.animated_path.clear()
-            self.animation_timer.stop()
+            self._anim.stop()
             self.update()
 
     # Solve the puzzle
     def try_solve(self):
         try:
             solver = ZipSolver(self.numbers, self.bh, self.bv)
-            res = solver.solve()
+            if _zip_kernel is not None:
+                res = _kernel_solve(solver)
+            else:
+                res = solver.solve()
             if not res:
                 QMessageBox.information(self, "Zip Solver", "No solution.")
                 return
@@ -357,6 +462,10 @@ class GridWidget(QWidget):
 
 # Necessary to toggle between screens (size selection and game)
 def create_zip_window(app=None):
+    # Compile the solver kernel now rather than on the first solve
+    if _zip_kernel is not None:
+        warmup_zip()
+
     # Create the main window
     root = QWidget()
     root.setWindowTitle("Zip Solver")